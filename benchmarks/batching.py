@@ -0,0 +1,99 @@
+"""
+Small-task throughput benchmark for JSON-RPC batching.
+
+Starts a Math Agent on localhost and delegates small math tasks to it, once
+with one HTTP request per task and once with the client-side batching window
+enabled, in two ways:
+
+- straight through MathAgentClient from a private pool of as many threads as
+  there are callers, with no admission control. This is the batcher's own
+  ceiling, not what the Echo Agent reaches.
+- through the Echo Agent's MyAgentTaskManager.on_send_task with the shipped
+  defaults: admission control on both agents and delegations running on
+  asyncio's default executor, which has min(32, CPUs + 4) threads however many
+  callers there are. Every task comes from a different user, since a single
+  user is held to the Echo Agent's per-client rate limit (50 tasks/s).
+
+    uv run python benchmarks/batching.py
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import time
+
+import click
+
+from a2a_demo.admission import AdmissionController, current_client
+from a2a_demo.task_manager import MathAgentClient, MyAgentTaskManager
+from common import echo_task_manager, send_task_request, start_math_agent
+
+
+def _run(client: MathAgentClient, concurrency: int, tasks: int) -> tuple[float, int]:
+    def delegate(i):
+        result, _ = client._try_math_agent(f"What is {i} * 13?")
+        return result
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(delegate, range(tasks)))
+    elapsed = time.perf_counter() - started
+    failures = sum(1 for result in results if result.startswith("Error"))
+    return tasks / elapsed, failures
+
+
+async def _run_echo(task_manager: MyAgentTaskManager, concurrency: int, tasks: int) -> tuple[float, int]:
+    async def caller(n: int, count: int) -> int:
+        failures = 0
+        for i in range(count):
+            current_client.set(f"user-{n}-{i}")
+            response = await task_manager.on_send_task(send_task_request(f"What is {i} * 13?"))
+            text = response.result.status.message.parts[0].text if response.error is None else "Error"
+            if "Error" in text or "Local calculation" in text:
+                failures += 1
+        return failures
+
+    started = time.perf_counter()
+    failures = await asyncio.gather(*(caller(n, tasks // concurrency) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return concurrency * (tasks // concurrency) / elapsed, sum(failures)
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", default=10013)
+@click.option("--tasks", default=2000, help="Tasks to delegate per run")
+@click.option("--window", default=0.005, help="Batching window in seconds")
+def main(host, port, tasks, window):
+    logging.getLogger().setLevel(logging.WARNING)
+    # Admission control as the Math Agent CLI configures it by default
+    start_math_agent(host, port, admission=AdmissionController(client_rate=0))
+
+    url = f"http://{host}:{port}"
+    unbatched = MathAgentClient(url)
+    batched = MathAgentClient(url, batch_window=window)
+    # Warm up both paths
+    _run(unbatched, 4, 50)
+    _run(batched, 4, 50)
+
+    print(f"{'callers':>8} {'unbatched/s':>12} {'batched/s':>10} {'speedup':>8} {'failures':>9}")
+    for concurrency in (1, 8, 32, 128):
+        unbatched_rate, unbatched_failures = _run(unbatched, concurrency, tasks)
+        batched_rate, batched_failures = _run(batched, concurrency, tasks)
+        print(f"{concurrency:>8} {unbatched_rate:>12.0f} {batched_rate:>10.0f} "
+              f"{batched_rate / unbatched_rate:>7.2f}x {unbatched_failures + batched_failures:>9}")
+
+    # Failures here also count tasks shed by admission control or solved locally as a fallback
+    print(f"\nThrough the Echo Agent, default executor of {min(32, (os.cpu_count() or 1) + 4)} threads")
+    print(f"{'callers':>8} {'unbatched/s':>12} {'batched/s':>10} {'speedup':>8} {'failures':>9}")
+    unbatched = echo_task_manager(url, math_batch_window=0.0, admission=AdmissionController())
+    batched = echo_task_manager(url, math_batch_window=window, admission=AdmissionController())
+    for concurrency in (1, 8, 32, 128):
+        unbatched_rate, unbatched_failures = asyncio.run(_run_echo(unbatched, concurrency, tasks))
+        batched_rate, batched_failures = asyncio.run(_run_echo(batched, concurrency, tasks))
+        print(f"{concurrency:>8} {unbatched_rate:>12.0f} {batched_rate:>10.0f} "
+              f"{batched_rate / unbatched_rate:>7.2f}x {unbatched_failures + batched_failures:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Helpers shared by the benchmarks: a Math Agent served from a background thread
+and an Echo Agent task manager without an LLM, both in the benchmark's process.
+"""
+import threading
+import time
+import uuid
+
+import uvicorn
+from google_a2a.common.types import AgentCapabilities, AgentCard, Message, SendTaskRequest, TaskSendParams
+
+from a2a_demo.admission import AdmissionController
+from a2a_demo.math_task_manager import MathAgentTaskManager
+from a2a_demo.server import AgentServer
+from a2a_demo.task_manager import MyAgentTaskManager
+
+
+def start_math_agent(host: str, port: int, admission: AdmissionController | None = None, multiplex: bool = False):
+    """Serve a Math Agent on host:port from a daemon thread, returning once it accepts requests"""
+    agent_card = AgentCard(
+        name="Math Agent",
+        url=f"http://{host}:{port}/",
+        version="0.1.0",
+        capabilities=AgentCapabilities(streaming=False),
+        skills=[],
+    )
+    server = AgentServer(
+        agent_card=agent_card,
+        task_manager=MathAgentTaskManager(admission=admission),
+        host=host,
+        port=port,
+        multiplex=multiplex,
+    )
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host=host, port=port, log_level="warning"))
+    threading.Thread(target=uvicorn_server.run, daemon=True).start()
+    while not uvicorn_server.started:
+        time.sleep(0.05)
+
+
+def echo_task_manager(math_agent_url: str, **kwargs) -> MyAgentTaskManager:
+    """Echo Agent task manager delegating to `math_agent_url`, without an LLM unless one is set later"""
+    return MyAgentTaskManager(ollama_host="", ollama_model=None, math_agent_url=math_agent_url, **kwargs)
+
+
+def send_task_request(text: str) -> SendTaskRequest:
+    """A tasks/send request for a new task with one text part"""
+    return SendTaskRequest(
+        id=str(uuid.uuid4()),
+        params=TaskSendParams(
+            id=str(uuid.uuid4()),
+            message=Message(role="user", parts=[{"type": "text", "text": text}]),
+        ),
+    )
@@ -0,0 +1,161 @@
+"""
+Overload benchmark for the admission controller.
+
+Drives a simulated task manager with open-loop traffic at increasing multiples
+of its capacity, once without admission control and once with it, and reports
+goodput: tasks answered successfully within the client's timeout, per second.
+
+The simulated agent shares its capacity between all in-flight tasks, so each
+task gets slower as more are accepted. Clients that time out walk away but the
+server keeps working on their tasks, which is what makes unprotected servers
+collapse under overload.
+
+Each load level runs twice: with a fixed service time, and with service times
+spread uniformly over 0.5x-4x of the median, like LLM calls whose answers vary
+in length. The adaptive limit should tell that spread apart from congestion.
+
+    uv run python benchmarks/overload.py
+"""
+import asyncio
+import itertools
+import logging
+import random
+import time
+import uuid
+
+import click
+from google_a2a.common.server.task_manager import InMemoryTaskManager
+from google_a2a.common.types import (
+    Message,
+    SendTaskRequest,
+    SendTaskResponse,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+)
+
+from a2a_demo.admission import AdmissionController, admission_controlled, current_client
+
+
+class SimulatedTaskManager(InMemoryTaskManager):
+    """
+    Task manager whose throughput is capped at `capacity` tasks per `service_time`.
+
+    Each task needs `service_time` times a factor drawn uniformly from `spread`;
+    the factors are normalized so the mean work per task stays `service_time`.
+    """
+
+    def __init__(self, capacity: int, service_time: float, spread=(1.0, 1.0), admission=None):
+        super().__init__()
+        self.capacity = capacity
+        self.service_time = service_time
+        self.spread = spread
+        self.admission = admission
+        self.inflight = 0
+
+    @admission_controlled(SendTaskResponse)
+    async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
+        task = await self.upsert_task(request.params)
+        self.inflight += 1
+        try:
+            remaining = self.service_time * random.uniform(*self.spread) / (sum(self.spread) / 2)
+            while remaining > 0:
+                await asyncio.sleep(0.005)
+                remaining -= 0.005 * min(1.0, self.capacity / self.inflight)
+        finally:
+            self.inflight -= 1
+        task.status = TaskStatus(state=TaskState.COMPLETED)
+        return SendTaskResponse(id=request.id, result=task)
+
+    async def on_send_task_subscribe(self, request):
+        pass
+
+
+async def _call(task_manager, client_id: str, timeout: float, stats: dict):
+    current_client.set(client_id)
+    request = SendTaskRequest(
+        id=str(uuid.uuid4()),
+        params=TaskSendParams(
+            id=str(uuid.uuid4()),
+            message=Message(role="user", parts=[{"type": "text", "text": "What is 25 * 13?"}]),
+        ),
+    )
+    started = time.monotonic()
+    # Shield the work so it keeps running on the server after the client gives up
+    work = asyncio.ensure_future(task_manager.on_send_task(request))
+    try:
+        response = await asyncio.wait_for(asyncio.shield(work), timeout=timeout)
+    except asyncio.TimeoutError:
+        stats["timed_out"] += 1
+        return
+    latency = time.monotonic() - started
+    if response.error is not None:
+        stats["rejected"] += 1
+        stats["reject_latency"].append(latency)
+    else:
+        stats["ok"] += 1
+        stats["latency"].append(latency)
+
+
+async def _run(task_manager, rate: float, duration: float, timeout: float, clients: int) -> dict:
+    stats = {"ok": 0, "rejected": 0, "timed_out": 0, "latency": [], "reject_latency": [], "limit": []}
+    client_ids = itertools.cycle([f"client-{i}" for i in range(clients)])
+    calls = []
+    started = time.monotonic()
+    for i in itertools.count():
+        next_at = started + i / rate
+        if next_at - started >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        if task_manager.admission is not None:
+            stats["limit"].append(task_manager.admission.limit)
+        calls.append(asyncio.create_task(_call(task_manager, next(client_ids), timeout, stats)))
+    await asyncio.gather(*calls)
+    # Let abandoned work drain so it doesn't leak into the next run
+    while task_manager.inflight:
+        await asyncio.sleep(0.05)
+    return stats
+
+
+def _p99(values) -> str:
+    if not values:
+        return "-"
+    values = sorted(values)
+    return f"{values[min(len(values) - 1, int(len(values) * 0.99))]:.3f}s"
+
+
+@click.command()
+@click.option("--capacity", default=8, help="Tasks the simulated agent can work on at full speed")
+@click.option("--service-time", default=0.05, help="Seconds one task takes without contention")
+@click.option("--duration", default=5.0, help="Seconds of traffic per load level")
+@click.option("--timeout", default=0.5, help="Client timeout in seconds")
+@click.option("--clients", default=8, help="Number of distinct clients sending traffic")
+def main(capacity, service_time, duration, timeout, clients):
+    logging.getLogger("a2a_demo").setLevel(logging.WARNING)
+    max_throughput = capacity / service_time
+    print(f"Simulated capacity: {max_throughput:.0f} tasks/s, client timeout {timeout}s\n")
+    print(f"{'latency':<9} {'admission':<10} {'load':>5} {'offered/s':>10} {'goodput/s':>10} "
+          f"{'rejected':>9} {'timed out':>10} {'p99 ok':>8} {'p99 reject':>11} {'mean limit':>11}")
+
+    for profile, spread in (("fixed", (1.0, 1.0)), ("variable", (0.5, 4.0))):
+        for load in (0.5, 1.0, 2.0, 4.0):
+            rate = max_throughput * load
+            for enabled in (False, True):
+                admission = None
+                if enabled:
+                    admission = AdmissionController(
+                        max_concurrency=4 * capacity,
+                        queue_timeout=timeout / 2,
+                        client_rate=2 * rate / clients,
+                        client_burst=rate / clients,
+                    )
+                task_manager = SimulatedTaskManager(capacity, service_time, spread, admission=admission)
+                stats = asyncio.run(_run(task_manager, rate, duration, timeout, clients))
+                mean_limit = f"{sum(stats['limit']) / len(stats['limit']):.1f}" if stats["limit"] else "-"
+                print(f"{profile:<9} {'on' if enabled else 'off':<10} {load:>4.1f}x {rate:>10.0f} "
+                      f"{stats['ok'] / duration:>10.1f} {stats['rejected']:>9} {stats['timed_out']:>10} "
+                      f"{_p99(stats['latency']):>8} {_p99(stats['reject_latency']):>11} {mean_limit:>11}")
+        print()
+
+if __name__ == "__main__":
+    main()
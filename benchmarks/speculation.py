@@ -0,0 +1,148 @@
+"""
+Latency and wasted-work benchmark for speculative math/LLM routing.
+
+Runs a mixed corpus of prompts through the Echo Agent's task manager, backed by
+a real Math Agent on localhost and a simulated LLM with a fixed latency
+distribution, in three modes:
+
+- hard choice: the existing behaviour. When a prompt routed to the Math Agent
+  only gets a guessed answer, the user notices and retries it through the LLM,
+  so the time to a usable answer is the math call, the user's reaction time
+  (`--retry-delay`) and the LLM call.
+- speculative: ambiguous prompts race the Math Agent against the LLM, with the
+  default speculation budget.
+- speculative, unbounded: the same with a budget that never runs out.
+
+    uv run python benchmarks/speculation.py
+"""
+import asyncio
+import collections
+import logging
+import random
+import statistics
+import time
+import types
+
+import click
+
+from a2a_demo.math_task_manager import CONFIDENCE_KEY
+from a2a_demo.speculation import SpeculativeRouter
+from a2a_demo.task_manager import MyAgentTaskManager
+from common import echo_task_manager, send_task_request, start_math_agent
+
+CORPUS = {
+    "math": [
+        "What is 25 * 13?",
+        "Calculate sqrt(144)",
+        "120 / 8",
+    ],
+    "ambiguous math": [
+        "What is 7 plus 5?",
+        "what is 9 times 8",
+        "Compute 100 minus 37",
+    ],
+    "ambiguous other": [
+        "What is 5 apples plus 3 oranges in a basket?",
+        "Solve my problem with 2 cats and 3 dogs fighting",
+        "Calculate the best route for 3 trucks and 5 stops",
+    ],
+    "other": [
+        "Tell me a joke about databases",
+        "Who wrote Hamlet?",
+        "Summarize the plot of 1984 in 2 sentences",
+    ],
+}
+
+
+class SimulatedLLM:
+    """Stands in for the Ollama agent, taking `latency` seconds on average per call"""
+
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.busy_seconds = 0.0
+        self.wasted_seconds = 0.0
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        duration = max(0.05, random.gauss(self.latency, self.jitter))
+        started = time.perf_counter()
+        try:
+            await asyncio.sleep(duration)
+        except asyncio.CancelledError:
+            self.wasted_seconds += time.perf_counter() - started
+            raise
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+        return {"messages": [types.SimpleNamespace(content=f"LLM answer to: {inputs['messages']}")]}
+
+
+async def _ask(task_manager: MyAgentTaskManager, text: str, retry_delay: float) -> float:
+    """Seconds until the user has a usable answer, retrying through the LLM after a guess"""
+    started = time.perf_counter()
+    response = await task_manager.on_send_task(send_task_request(text))
+    metadata = response.result.metadata or {}
+    if metadata.get("route") == "math" and metadata.get(CONFIDENCE_KEY, 0) < 0.5:
+        await asyncio.sleep(retry_delay)
+        await task_manager._run_llm(text)
+    return time.perf_counter() - started
+
+
+async def _run(task_manager: MyAgentTaskManager, rounds: int, concurrency: int, retry_delay: float) -> dict:
+    prompts = [(category, text) for category, texts in CORPUS.items() for text in texts] * rounds
+    random.shuffle(prompts)
+    latencies = collections.defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ask(category, text):
+        async with semaphore:
+            latencies[category].append(await _ask(task_manager, text, retry_delay))
+
+    await asyncio.gather(*(ask(category, text) for category, text in prompts))
+    return latencies
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", default=10033)
+@click.option("--rounds", default=10, help="Times the corpus is replayed per mode")
+@click.option("--concurrency", default=8, help="Prompts in flight at once")
+@click.option("--llm-latency", default=0.8, help="Mean simulated LLM latency in seconds")
+@click.option("--retry-delay", default=2.0, help="Seconds a user takes to notice a guessed answer and retry")
+def main(host, port, rounds, concurrency, llm_latency, retry_delay):
+    logging.getLogger().setLevel(logging.WARNING)
+    random.seed(0)
+    start_math_agent(host, port)
+
+    modes = {
+        "hard choice": None,
+        "speculative": SpeculativeRouter(),
+        "speculative, unbounded": SpeculativeRouter(max_share=1.0, burst=float("inf")),
+    }
+    for name, speculation in modes.items():
+        llm = SimulatedLLM(latency=llm_latency, jitter=llm_latency / 4)
+        task_manager = echo_task_manager(f"http://{host}:{port}", speculation=speculation)
+        task_manager.ollama_agent = llm
+        latencies = asyncio.run(_run(task_manager, rounds, concurrency, retry_delay))
+
+        print(f"\n== {name}")
+        print(f"{'prompts':<16} {'mean':>8} {'p95':>8}")
+        for category in CORPUS:
+            values = sorted(latencies[category])
+            print(f"{category:<16} {statistics.mean(values):>7.3f}s {values[int(len(values) * 0.95)]:>7.3f}s")
+        everything = [value for values in latencies.values() for value in values]
+        print(f"{'all':<16} {statistics.mean(everything):>7.3f}s")
+        print(f"LLM calls started {llm.calls}, LLM busy {llm.busy_seconds:.1f}s, "
+              f"of which cancelled speculation {llm.wasted_seconds:.2f}s")
+        if speculation is not None:
+            stats = speculation.stats
+            print(f"speculations {stats['speculations']} (over budget {stats['over_budget']}), "
+                  f"math wins {stats['math_wins']}, LLM wins {stats['llm_wins']}, "
+                  f"wasted math calls {stats['math_calls_wasted']}")
+            print(f"math calls still running when the LLM won {stats['math_abandoned']}, "
+                  f"running on for {stats['math_abandoned_seconds']:.3f}s in total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Latency and CPU benchmark for the agent-to-agent transports.
+
+Starts a Math Agent with the multiplexed transport enabled on localhost and
+delegates small math tasks to it through MathAgentClient over:
+
+- plain JSON-RPC, one HTTP request per task
+- the multiplexed WebSocket transport with JSON messages
+- the multiplexed WebSocket transport with MessagePack messages
+
+Latency is measured with one caller at a time; throughput and CPU with many
+concurrent callers. CPU time covers both client and server, which share this
+process.
+
+    uv run --extra multiplex python benchmarks/transport.py
+"""
+import concurrent.futures
+import logging
+import statistics
+import time
+
+import click
+
+from a2a_demo.task_manager import MathAgentClient
+from a2a_demo.transport import SUBPROTOCOL_JSON, SUBPROTOCOL_MSGPACK, MultiplexedTransport
+from common import start_math_agent
+
+
+def _delegate(client: MathAgentClient, i: int) -> float:
+    started = time.perf_counter()
+    result, _ = client._try_math_agent(f"What is {i} * 13?")
+    if result.startswith("Error"):
+        raise RuntimeError(result)
+    return time.perf_counter() - started
+
+
+def _latency(client: MathAgentClient, tasks: int) -> tuple[float, float]:
+    latencies = sorted(_delegate(client, i) for i in range(tasks))
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def _throughput(client: MathAgentClient, concurrency: int, tasks: int) -> tuple[float, float]:
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda i: _delegate(client, i), range(tasks)))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    return tasks / elapsed, cpu / tasks
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", default=10023)
+@click.option("--tasks", default=2000, help="Tasks to delegate per measurement")
+@click.option("--concurrency", default=32, help="Concurrent callers for the throughput measurement")
+def main(host, port, tasks, concurrency):
+    logging.getLogger().setLevel(logging.WARNING)
+    # No admission control: the benchmark itself is the only client
+    start_math_agent(host, port, multiplex=True)
+    url = f"http://{host}:{port}"
+    ws_url = f"ws://{host}:{port}/ws"
+
+    clients = {}
+    clients["http + json"] = MathAgentClient(url)
+    clients["websocket + json"] = MathAgentClient(url)
+    clients["websocket + json"].transport = MultiplexedTransport(ws_url, [SUBPROTOCOL_JSON])
+    clients["websocket + msgpack"] = MathAgentClient(url)
+    clients["websocket + msgpack"].transport = MultiplexedTransport(ws_url, [SUBPROTOCOL_MSGPACK])
+
+    print(f"{'transport':<20} {'p50':>8} {'p99':>8} {'tasks/s':>9} {'CPU/task':>9}")
+    for name, client in clients.items():
+        # Warm up connections and code paths
+        _throughput(client, 4, 100)
+        p50, p99 = _latency(client, tasks)
+        rate, cpu = _throughput(client, concurrency, tasks)
+        print(f"{name:<20} {p50 * 1e3:>6.2f}ms {p99 * 1e3:>6.2f}ms {rate:>9.0f} {cpu * 1e6:>7.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
 import logging
 import click
 from google_a2a.common.types import AgentSkill, AgentCapabilities, AgentCard
-from google_a2a.common.server import A2AServer
+from a2a_demo.admission import AdmissionController
+from a2a_demo.server import AgentServer
+from a2a_demo.speculation import SpeculativeRouter
 from a2a_demo.task_manager import MyAgentTaskManager
+from a2a_demo.tracing import configure_tracing
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def echo_agent(host, port, ollama_host, ollama_model, math_agent_url):
+def echo_agent(host, port, ollama_host, ollama_model, math_agent_url,
+               max_concurrency=16, queue_timeout=2.0, client_rate=50.0, client_burst=100.0,
+               admin_token=None, math_batch_window=0.005, multiplex=False, speculate=False, speculation_share=0.2):
     """Run the Echo Agent that can delegate math questions to the Math Agent"""
     # Define the Echo Agent's skill
     skill = AgentSkill(
@@ -43,24 +48,43 @@ def echo_agent(host, port, ollama_host, ollama_model, math_agent_url):
     task_manager = MyAgentTaskManager(
         ollama_host=ollama_host,
         ollama_model=ollama_model,
-        math_agent_url=math_agent_url
+        math_agent_url=math_agent_url,
+        math_batch_window=math_batch_window,
+        multiplex=multiplex,
+        speculation=SpeculativeRouter(max_share=speculation_share) if speculate else None,
+        admission=AdmissionController(
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            client_rate=client_rate,
+            client_burst=client_burst,
+        ),
     )
-    server = A2AServer(
+    server = AgentServer(
         agent_card=agent_card,
         task_manager=task_manager,
         host=host,
         port=port,
+        admin_token=admin_token,
+        multiplex=multiplex,
     )
     server.start()
 
-def math_agent(host, port):
+def math_agent(host, port, max_concurrency, queue_timeout, trace_file, admin_token, multiplex):
     """Run the Math Agent"""
     try:
         # Import here to avoid circular imports
         from a2a_demo.math_agent import main as math_main
         # Since math_main is a Click command, we need to invoke it in a different way
         from a2a_demo import math_agent
-        math_agent.main(["--host", host, "--port", str(port)])
+        math_agent.main([
+            "--host", host,
+            "--port", str(port),
+            "--max-concurrency", str(max_concurrency),
+            "--queue-timeout", str(queue_timeout),
+            *(["--trace-file", trace_file] if trace_file else []),
+            *(["--admin-token", admin_token] if admin_token else []),
+            *(["--multiplex"] if multiplex else []),
+        ])
     except Exception as e:
         logger.error(f"Failed to start Math Agent: {e}")
         logger.error("Math Agent will not be available")
@@ -73,17 +97,44 @@ def math_agent(host, port):
 @click.option("--ollama-host", default="http://localhost:11434")
 @click.option("--ollama-model", default="llama3.2")
 @click.option("--not-start-math", is_flag=True, default=False, help="Whether not to start the Math Agent")
-def main(echo_host, echo_port, math_host, math_port, ollama_host, ollama_model, not_start_math):
+@click.option("--max-concurrency", default=16, help="Maximum number of tasks each agent works on at once")
+@click.option("--queue-timeout", default=2.0, help="Seconds a task may wait for a free slot before being rejected")
+@click.option("--client-rate", default=50.0,
+              help="Tasks per second allowed per client of the Echo Agent (0 disables rate limiting)")
+@click.option("--client-burst", default=100.0, help="Burst size of the per-client rate limit")
+@click.option("--trace-file", default=None, help="File to append request traces to (JSON lines)")
+@click.option("--admin-token", envvar="A2A_ADMIN_TOKEN", default=None,
+              help="Bearer token enabling the /admin/profile endpoint")
+@click.option("--math-batch-window", default=0.005,
+              help="Seconds to hold concurrent Math Agent calls for batching (0 disables batching)")
+@click.option("--multiplex", is_flag=True, default=False,
+              help="Offer and use a multiplexed WebSocket transport with MessagePack between the agents")
+@click.option("--speculate", is_flag=True, default=False,
+              help="Send ambiguous questions to the Math Agent and the LLM at once and keep the first confident answer")
+@click.option("--speculation-share", default=0.2, help="Largest share of LLM calls that may be speculative")
+def main(echo_host, echo_port, math_host, math_port, ollama_host, ollama_model, not_start_math,
+         max_concurrency, queue_timeout, client_rate, client_burst, trace_file, admin_token, math_batch_window,
+         multiplex, speculate, speculation_share):
     """Run both Echo and Math agents simultaneously"""
     import threading
     import time
+
+    configure_tracing(trace_file)
     
     math_thread = None
     if not not_start_math:
         # Start the Math Agent in a separate thread
         math_thread = threading.Thread(
             target=math_agent,
-            kwargs={"host": math_host, "port": math_port}
+            kwargs={
+                "host": math_host,
+                "port": math_port,
+                "max_concurrency": max_concurrency,
+                "queue_timeout": queue_timeout,
+                "trace_file": trace_file,
+                "admin_token": admin_token,
+                "multiplex": multiplex,
+            }
         )
         math_thread.daemon = True
         math_thread.start()
@@ -98,7 +149,16 @@ def main(echo_host, echo_port, math_host, math_port, ollama_host, ollama_model,
         port=echo_port,
         ollama_host=ollama_host,
         ollama_model=ollama_model,
-        math_agent_url=math_agent_url
+        math_agent_url=math_agent_url,
+        max_concurrency=max_concurrency,
+        queue_timeout=queue_timeout,
+        client_rate=client_rate,
+        client_burst=client_burst,
+        admin_token=admin_token,
+        math_batch_window=math_batch_window,
+        multiplex=multiplex,
+        speculate=speculate,
+        speculation_share=speculation_share,
     )
 
 
@@ -0,0 +1,289 @@
+import asyncio
+import collections
+import contextvars
+import functools
+import logging
+import time
+from typing import Any
+
+from google_a2a.common.types import JSONRPCError
+
+logger = logging.getLogger(__name__)
+
+# Identity of the client whose request is currently being handled.
+# Set by AgentServer for every incoming HTTP request.
+current_client = contextvars.ContextVar("current_client", default="anonymous")
+
+# Kind of work the current request turned out to be, e.g. "math" or "llm".
+# Handlers set it so the adaptive limit only compares latencies of like requests.
+current_route = contextvars.ContextVar("current_route", default="default")
+
+# Background task still doing the current request's work after its handler returns,
+# e.g. one producing the events of a stream. Its slot is held until the task is done.
+current_work = contextvars.ContextVar("current_work", default=None)
+
+
+class ServerOverloadedError(JSONRPCError):
+    code: int = -32050
+    message: str = "Server is overloaded, please retry later"
+    data: Any | None = None
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being admitted"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Per-client rate limiter refilling `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take one token if available"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next token becomes available"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled completely, i.e. it is no different from a new one"""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class AIMDLimit:
+    """
+    Adaptive concurrency limit using additive increase / multiplicative decrease.
+
+    The congestion signal is the latency gradient of each route: a short-term
+    average of its latencies compared with a long-term one. A single slow
+    request, such as an LLM call with a long answer, barely moves the
+    short-term average, while congestion slows every request and lifts it
+    above the long-term average. Routes are tracked separately because requests of
+    different kinds (a math delegation versus an LLM call) take very different
+    times. When any route's short-term average exceeds `tolerance` times its
+    long-term one, the limit shrinks by `backoff_ratio` (at most once per
+    observed latency); otherwise it grows by roughly one per limit's worth of
+    completed requests while it is being used.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff_ratio: float = 0.9,
+        tolerance: float = 1.5,
+        short_window: int = 10,
+        long_window: int = 100,
+    ):
+        self._limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.tolerance = tolerance
+        self.short_window = short_window
+        self.long_window = long_window
+        self._latencies: dict[str, list[float]] = {}
+        self._next_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def gradient(self, route: str) -> float | None:
+        """Short-term over long-term average latency of the route, above 1 when it is slowing down"""
+        latencies = self._latencies.get(route)
+        return latencies[1] / latencies[2] if latencies else None
+
+    def on_sample(self, latency: float, inflight: int, route: str = "default"):
+        """Record the latency of a completed request of the given route"""
+        latencies = self._latencies.get(route)
+        if latencies is None:
+            latencies = self._latencies[route] = [0, latency, latency]
+        # [samples seen, short-term average, long-term average]; both are plain
+        # means until their window has filled, then exponential moving averages
+        latencies[0] += 1
+        latencies[1] += (latency - latencies[1]) / min(latencies[0], self.short_window)
+        latencies[2] += (latency - latencies[2]) / min(latencies[0], self.long_window)
+        now = time.monotonic()
+
+        if latencies[1] > latencies[2] * self.tolerance:
+            if now >= self._next_decrease:
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                self._next_decrease = now + latency
+                logger.info(f"Concurrency limit decreased to {self.limit} "
+                            f"({route} latency up {latencies[1] / latencies[2]:.1f}x)")
+        elif inflight * 2 >= self._limit:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+
+class AdmissionController:
+    """
+    Decides whether a request is served, queued or rejected.
+
+    Requests are first charged against the caller's token bucket, then either
+    take a free concurrency slot or wait in a FIFO queue. The queue is bounded
+    by deadline rather than length: a request whose estimated wait already
+    exceeds `queue_timeout` is rejected immediately, and one that waits longer
+    than that is rejected when the deadline passes. Buckets of clients that
+    have been idle long enough to refill completely are dropped.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        queue_timeout: float = 2.0,
+        client_rate: float = 50.0,
+        client_burst: float = 100.0,
+        adaptive: bool = True,
+    ):
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.limiter = None
+        if adaptive:
+            self.limiter = AIMDLimit(initial_limit=max(1, max_concurrency // 4), max_limit=max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.inflight = 0
+        self._waiters = collections.deque()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._next_eviction = 0.0
+        self._latency = None
+
+    @property
+    def limit(self) -> int:
+        if self.limiter is not None:
+            return self.limiter.limit
+        return self.max_concurrency
+
+    def _estimated_wait(self) -> float:
+        if self._latency is None:
+            return 0.0
+        return (len(self._waiters) + 1) * self._latency / self.limit
+
+    def _evict_idle_buckets(self, now: float):
+        """Drop buckets that are full again; a new bucket would behave the same"""
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + self.client_burst / self.client_rate
+        idle = [client_id for client_id, bucket in self._buckets.items() if bucket.is_full(now)]
+        for client_id in idle:
+            del self._buckets[client_id]
+
+    def _check_rate(self, client_id: str):
+        if self.client_rate <= 0:
+            return
+        self._evict_idle_buckets(time.monotonic())
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = self._buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+        if not bucket.try_acquire():
+            raise AdmissionRejected(f"rate limit exceeded for {client_id}", bucket.retry_after())
+
+    async def acquire(self, client_id: str) -> float:
+        """Wait for a concurrency slot, returning the time the request was admitted"""
+        self._check_rate(client_id)
+
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            return time.monotonic()
+
+        estimated_wait = self._estimated_wait()
+        if estimated_wait > self.queue_timeout:
+            raise AdmissionRejected("queue is full", estimated_wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up, pass it on
+                self._release_slot()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise AdmissionRejected("timed out waiting in queue", self._estimated_wait())
+        return time.monotonic()
+
+    def release(self, admitted_at: float, route: str = "default"):
+        """Return a slot taken by acquire() and record the request latency"""
+        latency = time.monotonic() - admitted_at
+        self._latency = latency if self._latency is None else 0.9 * self._latency + 0.1 * latency
+        if self.limiter is not None:
+            self.limiter.on_sample(latency, self.inflight, route)
+        self._release_slot()
+
+    def _release_slot(self):
+        self.inflight -= 1
+        while self._waiters and self.inflight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+
+def admission_controlled(response_cls):
+    """
+    Decorate a task manager handler so it runs under `self.admission`.
+
+    Rejected requests get an immediate `ServerOverloadedError` response of type
+    `response_cls`. Handlers that hand their work to a background task, as
+    streaming handlers do, set it in `current_work`, and the slot is held
+    until that task is done, whether or not the stream is ever read.
+    Latencies are recorded under the route the handler set in `current_route`.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(self, request):
+            if self.admission is None:
+                return await handler(self, request)
+
+            try:
+                admitted_at = await self.admission.acquire(current_client.get())
+            except AdmissionRejected as e:
+                logger.debug(f"Rejected request {request.id}: {e.reason}")
+                return response_cls(
+                    id=request.id,
+                    error=ServerOverloadedError(data={"reason": e.reason, "retryAfter": round(e.retry_after, 3)}),
+                )
+
+            route_token = current_route.set("default")
+            work_token = current_work.set(None)
+            try:
+                result = await handler(self, request)
+            except BaseException:
+                self.admission.release(admitted_at, current_route.get())
+                raise
+            finally:
+                route = current_route.get()
+                work = current_work.get()
+                current_route.reset(route_token)
+                current_work.reset(work_token)
+
+            if work is not None:
+                work.add_done_callback(lambda _: self.admission.release(admitted_at, route))
+            else:
+                self.admission.release(admitted_at, route)
+            return result
+        return wrapper
+    return decorator
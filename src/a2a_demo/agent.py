@@ -2,6 +2,8 @@ from langchain_ollama import ChatOllama
 from langgraph.prebuilt import create_react_agent
 from langgraph.graph.graph import CompiledGraph
 
+from a2a_demo.tracing import traced
+
 def create_ollama_agent(ollama_base_url: str, ollama_model: str):
     ollama_chat_llm = ChatOllama(
         base_url=ollama_base_url,
@@ -11,6 +13,7 @@ def create_ollama_agent(ollama_base_url: str, ollama_model: str):
     agent = create_react_agent(ollama_chat_llm, tools=[])
     return agent
 
+@traced("ollama.invoke")
 async def run_ollama(ollama_agent: CompiledGraph, prompt: str):
     agent_response = await ollama_agent.ainvoke(
         {"messages": prompt}
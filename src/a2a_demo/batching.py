@@ -0,0 +1,99 @@
+import concurrent.futures
+import logging
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class JSONRPCBatcher:
+    """
+    Groups concurrent JSON-RPC calls to one endpoint into batch requests.
+
+    A call made while no batch is in flight is sent straight away on its own.
+    Calls made while batches are in flight are held for up to `window` seconds
+    (or until `max_inflight` batches are no longer all busy) so that concurrent
+    callers can share a single HTTP request, and then sent as one JSON-RPC 2.0
+    batch array of at most `max_batch_size` calls.
+    """
+
+    def __init__(self, url: str, window: float = 0.005, max_batch_size: int = 32, max_inflight: int = 4):
+        self.url = url
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.max_inflight = max_inflight
+        self.session = requests.Session()
+        self._pending = []
+        self._inflight = 0
+        self._cond = threading.Condition()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_inflight,
+            thread_name_prefix="jsonrpc-batch",
+        )
+        threading.Thread(target=self._flush_loop, name="jsonrpc-batcher", daemon=True).start()
+
+    def call(self, payload: dict, headers: dict = None, timeout: float = 10) -> dict:
+        """Send one JSON-RPC request and wait for its response"""
+        future = concurrent.futures.Future()
+        entry = (payload, headers, future)
+        with self._cond:
+            self._pending.append(entry)
+            self._cond.notify()
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            # Don't send a call nobody is waiting for any more
+            with self._cond:
+                self._pending = [pending for pending in self._pending if pending is not entry]
+            raise
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending or self._inflight >= self.max_inflight:
+                    self._cond.wait()
+                if self._inflight > 0:
+                    # Other batches are on the wire, give concurrent callers a moment to join
+                    deadline = time.monotonic() + self.window
+                    while len(self._pending) < self.max_batch_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                self._inflight += 1
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch: list):
+        try:
+            if len(batch) == 1:
+                payload, headers, future = batch[0]
+                response = self.session.post(self.url, json=payload, headers=headers, timeout=10)
+                response.raise_for_status()
+                future.set_result(response.json())
+                return
+
+            response = self.session.post(self.url, json=[payload for payload, _, _ in batch], timeout=10)
+            response.raise_for_status()
+            results = response.json()
+            if not isinstance(results, list):
+                raise ValueError(f"Expected a batch response, got: {results}")
+            results_by_id = {result.get("id"): result for result in results}
+            for payload, _, future in batch:
+                result = results_by_id.get(payload["id"])
+                if result is None:
+                    future.set_exception(ValueError(f"No response for request {payload['id']} in batch"))
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            logger.warning(f"JSON-RPC batch of {len(batch)} failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify()
@@ -2,8 +2,10 @@ import logging
 import re
 import click
 from google_a2a.common.types import AgentSkill, AgentCapabilities, AgentCard
-from google_a2a.common.server import A2AServer
+from a2a_demo.admission import AdmissionController
 from a2a_demo.math_task_manager import MathAgentTaskManager
+from a2a_demo.server import AgentServer
+from a2a_demo.tracing import configure_tracing
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,7 +13,18 @@ logger = logging.getLogger(__name__)
 @click.command()
 @click.option("--host", default="localhost")
 @click.option("--port", default=10003)
-def main(host, port):
+@click.option("--max-concurrency", default=16)
+@click.option("--queue-timeout", default=2.0)
+# The Math Agent is called by peer agents, which send all their users' tasks from one
+# address, so per-client rate limiting is off unless asked for
+@click.option("--client-rate", default=0.0)
+@click.option("--client-burst", default=100.0)
+@click.option("--trace-file", default=None)
+@click.option("--admin-token", envvar="A2A_ADMIN_TOKEN", default=None)
+@click.option("--multiplex", is_flag=True, default=False)
+def main(host, port, max_concurrency, queue_timeout, client_rate, client_burst, trace_file, admin_token, multiplex):
+    configure_tracing(trace_file)
+
     # Define the Math Agent's skill
     skill = AgentSkill(
         id="math-calculation-skill",
@@ -43,12 +56,21 @@ def main(host, port):
     logging.info(agent_card)
 
     # Initialize task manager and server
-    task_manager = MathAgentTaskManager()
-    server = A2AServer(
+    task_manager = MathAgentTaskManager(
+        admission=AdmissionController(
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            client_rate=client_rate,
+            client_burst=client_burst,
+        ),
+    )
+    server = AgentServer(
         agent_card=agent_card,
         task_manager=task_manager,
         host=host,
         port=port,
+        admin_token=admin_token,
+        multiplex=multiplex,
     )
     server.start()
 
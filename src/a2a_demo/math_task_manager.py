@@ -18,12 +18,32 @@ from google_a2a.common.types import (
     TaskStatusUpdateEvent,
 )
 
+from a2a_demo.admission import AdmissionController, admission_controlled
+from a2a_demo.tracing import traced
+
 logger = logging.getLogger(__name__)
 
+# How much to trust an answer, reported in the task metadata under CONFIDENCE_KEY
+CONFIDENCE_KEY = "confidence"
+CONFIDENCE_EXACT = 1.0  # An explicit expression or function was evaluated
+CONFIDENCE_GUESS = 0.2  # Numbers were found without an operation and summed as a guess
+CONFIDENCE_NONE = 0.0  # No answer could be computed
+
+# Spelled-out operators between two numbers, e.g. "5 plus 3"
+WORD_OPERATORS = [
+    (r'(?<=\d)\s+plus\s+(?=\d)', ' + '),
+    (r'(?<=\d)\s+minus\s+(?=\d)', ' - '),
+    (r'(?<=\d)\s+(?:times|multiplied by)\s+(?=\d)', ' * '),
+    (r'(?<=\d)\s+divided by\s+(?=\d)', ' / '),
+]
+
 class MathAgentTaskManager(InMemoryTaskManager):
-    def __init__(self):
+    def __init__(self, admission: Optional[AdmissionController] = None):
         super().__init__()
+        self.admission = admission
     
+    @admission_controlled(SendTaskResponse)
+    @traced("math.on_send_task")
     async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
         """Handle math calculation requests"""
         # Store the task in memory
@@ -36,7 +56,7 @@ class MathAgentTaskManager(InMemoryTaskManager):
         logger.info(f"Math Agent received: {message_text}")
         
         # Process the math expression
-        result = self._process_math_expression(message_text)
+        result, confidence = self._process_math_expression(message_text)
         
         # Update the task with the result
         task = await self._update_task(
@@ -44,19 +64,26 @@ class MathAgentTaskManager(InMemoryTaskManager):
             task_state=TaskState.COMPLETED,
             response_text=result,
         )
+        # Let callers judge the answer, e.g. to fall back to an LLM on a guess
+        task.metadata = {**(task.metadata or {}), CONFIDENCE_KEY: confidence}
         
         # Return the response
         return SendTaskResponse(id=request.id, result=task)
     
+    @admission_controlled(SendTaskStreamingResponse)
     async def on_send_task_subscribe(
         self,
         request: SendTaskStreamingRequest
     ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
         pass
     
-    def _process_math_expression(self, text: str) -> str:
-        """Process mathematical expressions in the text"""
+    @traced("math.process_math_expression")
+    def _process_math_expression(self, text: str) -> tuple[str, float]:
+        """Process mathematical expressions in the text, returning the answer and its confidence"""
         try:
+            for pattern, operator in WORD_OPERATORS:
+                text = re.sub(pattern, operator, text, flags=re.IGNORECASE)
+            
             # Try to extract a math expression using patterns
             # Pattern for basic arithmetic: digits and operators
             basic_math_pattern = r'(\d+\s*[\+\-\*\/\^\%]\s*\d+(?:\s*[\+\-\*\/\^\%]\s*\d+)*)'
@@ -73,7 +100,7 @@ class MathAgentTaskManager(InMemoryTaskManager):
                 # Replace ^ with ** for Python's power operator
                 expression = expression.replace('^', '**')
                 result = eval(expression)
-                return f"The result of {expression.replace('**', '^')} is {result}"
+                return f"The result of {expression.replace('**', '^')} is {result}", CONFIDENCE_EXACT
             elif function_match:
                 full_expr = function_match.group(0)
                 func_name = function_match.group(1)
@@ -96,9 +123,9 @@ class MathAgentTaskManager(InMemoryTaskManager):
                     elif func_name == 'exp':
                         result = math.exp(num)
                     else:
-                        return f"I don't know how to calculate {full_expr}"
+                        return f"I don't know how to calculate {full_expr}", CONFIDENCE_NONE
                     
-                    return f"The result of {full_expr} is {result}"
+                    return f"The result of {full_expr} is {result}", CONFIDENCE_EXACT
             
             # If no math expression is found, try to extract numbers and do a simple addition
             numbers = re.findall(r'\d+', text)
@@ -106,14 +133,15 @@ class MathAgentTaskManager(InMemoryTaskManager):
                 num1 = int(numbers[0])
                 num2 = int(numbers[1])
                 result = num1 + num2
-                return f"I found numbers {num1} and {num2}, their sum is {result}"
+                return f"I found numbers {num1} and {num2}, their sum is {result}", CONFIDENCE_GUESS
             
-            return "I couldn't find a valid mathematical expression to calculate."
+            return "I couldn't find a valid mathematical expression to calculate.", CONFIDENCE_NONE
         
         except Exception as e:
             logger.error(f"Error processing math expression: {str(e)}")
-            return f"I encountered an error while calculating: {str(e)}"
+            return f"I encountered an error while calculating: {str(e)}", CONFIDENCE_NONE
     
+    @traced("math.update_task")
     async def _update_task(
         self,
         task_id: str,
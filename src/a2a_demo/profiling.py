@@ -0,0 +1,37 @@
+import collections
+import sys
+import threading
+import time
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sample the stacks of every thread in the process for `seconds`.
+
+    Returns the profile in folded stack format, one `frame;frame;... count`
+    line per distinct stack with the root first, ready for flamegraph.pl or
+    speedscope. Each stack is prefixed with its thread name.
+    """
+    sampler = threading.get_ident()
+    counts = collections.Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, str(thread_id)))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
@@ -0,0 +1,234 @@
+import asyncio
+import hmac
+import json
+import logging
+
+from pydantic import ValidationError
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import WebSocketRoute
+from starlette.websockets import WebSocket
+
+from google_a2a.common.server import A2AServer
+from google_a2a.common.types import (
+    A2ARequest,
+    CancelTaskRequest,
+    GetTaskRequest,
+    InternalError,
+    InvalidRequestError,
+    JSONParseError,
+    JSONRPCResponse,
+    SendTaskRequest,
+)
+
+from a2a_demo.admission import current_client
+from a2a_demo.profiling import sample_stacks
+from a2a_demo.tracing import TRACEPARENT, current_service, start_span
+from a2a_demo.transport import (
+    TRANSPORT_WEBSOCKET,
+    WEBSOCKET_PATH,
+    can_serve_websockets,
+    decode,
+    encode,
+    supported_subprotocols,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_PROFILE_SECONDS = 60
+MAX_BATCH_SIZE = 100
+
+# Requests allowed inside a JSON-RPC batch or over the multiplexed transport, mapped
+# to their task manager handler. Streaming requests are excluded since each request
+# gets exactly one response there.
+SINGLE_RESPONSE_METHODS = {
+    SendTaskRequest: "on_send_task",
+    GetTaskRequest: "on_get_task",
+    CancelTaskRequest: "on_cancel_task",
+}
+
+
+def _metadata_traceparent(body):
+    """Trace context carried in a JSON-RPC request's task metadata, if any"""
+    if not isinstance(body, dict):
+        return None
+    params = body.get("params")
+    metadata = params.get("metadata") if isinstance(params, dict) else None
+    return metadata.get(TRACEPARENT) if isinstance(metadata, dict) else None
+
+
+class AgentServer(A2AServer):
+    """
+    A2AServer that records which client sent each request and traces it.
+
+    Besides single JSON-RPC requests, the endpoint accepts JSON-RPC 2.0 batch
+    arrays of `tasks/send`, `tasks/get` and `tasks/cancel` calls. The calls in
+    a batch are dispatched concurrently and answered in one array, in order.
+
+    When `multiplex` is set, the same calls can also be sent over a long-lived
+    WebSocket at `/ws`, many at a time, encoded as MessagePack or JSON depending
+    on the negotiated subprotocol. The agent card advertises it under
+    `transports` so clients can opt in and fall back to HTTP otherwise.
+
+    When `admin_token` is set, `GET /admin/profile?seconds=N` samples the live
+    server for N seconds and returns a folded-stack profile. The caller must
+    send the token as `Authorization: Bearer <token>`.
+    """
+
+    def __init__(self, *args, admin_token: str = None, multiplex: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.admin_token = admin_token
+        self._profile_lock = asyncio.Lock()
+        if admin_token:
+            self.app.add_route("/admin/profile", self._profile, methods=["GET"])
+
+        self.multiplex = multiplex and can_serve_websockets()
+        if multiplex and not self.multiplex:
+            logger.warning("No WebSocket implementation installed, multiplexed transport is disabled")
+        if self.multiplex:
+            self.app.router.routes.append(WebSocketRoute(WEBSOCKET_PATH, self._serve_websocket))
+
+    def _get_agent_card(self, request: Request) -> JSONResponse:
+        agent_card = self.agent_card.model_dump(exclude_none=True)
+        if self.multiplex:
+            base_url = agent_card["url"].rstrip("/").replace("http", "ws", 1)
+            agent_card["transports"] = [{
+                "type": TRANSPORT_WEBSOCKET,
+                "url": f"{base_url}{WEBSOCKET_PATH}",
+                "subprotocols": supported_subprotocols(),
+            }]
+        return JSONResponse(agent_card)
+
+    async def _process_request(self, request: Request):
+        client_id = request.client.host if request.client else "anonymous"
+        client_token = current_client.set(client_id)
+        service_token = current_service.set(self.agent_card.name)
+        try:
+            try:
+                # Starlette caches the parsed body, so the base class can read it again
+                body = await request.json()
+            except Exception:
+                body = None
+
+            with start_span(
+                "a2a.request",
+                traceparent=request.headers.get(TRACEPARENT) or _metadata_traceparent(body),
+                client=client_id,
+            ):
+                if isinstance(body, list):
+                    return await self._process_batch(body)
+                return await super()._process_request(request)
+        finally:
+            current_service.reset(service_token)
+            current_client.reset(client_token)
+
+    async def _process_batch(self, body: list) -> Response:
+        """Dispatch a JSON-RPC batch concurrently and answer with one batch response"""
+        if not body or len(body) > MAX_BATCH_SIZE:
+            error = InvalidRequestError(message=f"Batch must contain 1 to {MAX_BATCH_SIZE} requests")
+            response = JSONRPCResponse(id=None, error=error)
+            return JSONResponse(response.model_dump(exclude_none=True), status_code=400)
+
+        responses = await asyncio.gather(*(self._dispatch(item, "a2a.batch_item") for item in body))
+        responses = [response.model_dump(exclude_none=True) for response in responses if response is not None]
+        if not responses:
+            # A batch of only notifications gets no response body at all
+            return Response(status_code=204)
+        return JSONResponse(responses)
+
+    async def _dispatch(self, item, span_name: str) -> JSONRPCResponse | None:
+        """
+        Validate and run one JSON-RPC request that gets a single response.
+
+        Returns None for a notification, a valid request without an "id" member,
+        which is run but not answered.
+        """
+        request_id = item.get("id") if isinstance(item, dict) else None
+        is_notification = isinstance(item, dict) and "id" not in item
+        try:
+            json_rpc_request = A2ARequest.validate_python(item)
+        except ValidationError as e:
+            return JSONRPCResponse(id=request_id, error=InvalidRequestError(data=json.loads(e.json())))
+
+        handler_name = SINGLE_RESPONSE_METHODS.get(type(json_rpc_request))
+        if handler_name is None:
+            error = InvalidRequestError(message=f"{json_rpc_request.method} is not supported here")
+            return JSONRPCResponse(id=request_id, error=error)
+
+        with start_span(
+            span_name,
+            traceparent=_metadata_traceparent(item),
+            method=json_rpc_request.method,
+        ):
+            try:
+                response = await getattr(self.task_manager, handler_name)(json_rpc_request)
+            except Exception as e:
+                logger.error(f"Unhandled exception in request {request_id}: {e}")
+                response = JSONRPCResponse(id=request_id, error=InternalError())
+        return None if is_notification else response
+
+    async def _serve_websocket(self, websocket: WebSocket):
+        """Serve JSON-RPC requests arriving on one WebSocket concurrently"""
+        offered = websocket.scope.get("subprotocols", [])
+        subprotocol = next((p for p in offered if p in supported_subprotocols()), None)
+        if subprotocol is None:
+            await websocket.close(code=1002)
+            return
+        await websocket.accept(subprotocol=subprotocol)
+
+        client_id = websocket.client.host if websocket.client else "anonymous"
+        current_client.set(client_id)
+        current_service.set(self.agent_card.name)
+        logger.info(f"Multiplexed connection from {client_id} using {subprotocol}")
+
+        send_lock = asyncio.Lock()
+        handlers = set()
+
+        async def handle(data):
+            try:
+                response = await self._dispatch(decode(subprotocol, data), "a2a.ws_request")
+            except Exception:
+                response = JSONRPCResponse(id=None, error=JSONParseError())
+            if response is None:
+                return
+            message = encode(subprotocol, response.model_dump(mode="json", exclude_none=True))
+            async with send_lock:
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes") if message.get("bytes") is not None else message.get("text")
+                handler = asyncio.create_task(handle(data))
+                handlers.add(handler)
+                handler.add_done_callback(handlers.discard)
+        finally:
+            for handler in handlers:
+                handler.cancel()
+
+    async def _profile(self, request: Request):
+        # Compare bytes: compare_digest rejects str with non-ASCII characters. Starlette
+        # decodes headers as latin-1, so encoding back gives the bytes as sent
+        authorization = request.headers.get("authorization", "").encode("latin-1")
+        if not hmac.compare_digest(authorization, f"Bearer {self.admin_token}".encode()):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+        try:
+            seconds = float(request.query_params.get("seconds", 10))
+        except ValueError:
+            return JSONResponse({"error": "seconds must be a number"}, status_code=400)
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            return JSONResponse({"error": f"seconds must be in (0, {MAX_PROFILE_SECONDS}]"}, status_code=400)
+
+        if self._profile_lock.locked():
+            return JSONResponse({"error": "a profile is already running"}, status_code=409)
+        async with self._profile_lock:
+            logger.info(f"Profiling {self.agent_card.name} for {seconds} seconds")
+            # Sample from a worker thread so the event loop keeps serving (and being profiled)
+            profile = await asyncio.to_thread(sample_stacks, seconds)
+        return PlainTextResponse(profile)
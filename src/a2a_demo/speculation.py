@@ -0,0 +1,111 @@
+import asyncio
+import collections
+import functools
+import logging
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeRouter:
+    """
+    Races the math path against the LLM for prompts that could be either.
+
+    Prompts whose math score falls strictly between `lower` and `upper` are
+    ambiguous. For those, `race()` starts the Math Agent call and the LLM call
+    together. A math answer with at least `min_confidence` wins straight away
+    and the LLM call is cancelled; otherwise the LLM answer is used and the
+    math answer is dropped. The Math Agent client blocks a worker thread, which
+    cancelling cannot stop, so a math call still running at that point is left
+    to finish and counted as abandoned, along with how long it kept running.
+
+    Speculative LLM calls are paid for with credits: every LLM call made,
+    speculative or not, earns `max_share` of a credit through
+    `record_llm_call()` and every speculation costs one. So speculations never
+    exceed `burst` plus `max_share` of all LLM calls.
+    """
+
+    def __init__(
+        self,
+        max_share: float = 0.2,
+        burst: float = 5.0,
+        min_confidence: float = 0.5,
+        lower: float = 0.2,
+        upper: float = 0.8,
+    ):
+        self.max_share = max_share
+        self.burst = burst
+        self.min_confidence = min_confidence
+        self.lower = lower
+        self.upper = upper
+        self.credits = burst
+        self.stats = collections.Counter()
+
+    def is_ambiguous(self, math_score: float) -> bool:
+        return self.lower < math_score < self.upper
+
+    def record_llm_call(self):
+        """Earn credit for an LLM call, to be called for every call made"""
+        self.credits = min(self.burst, self.credits + self.max_share)
+
+    def try_acquire(self) -> bool:
+        """Spend a credit on a speculation if one is available"""
+        if self.credits < 1:
+            self.stats["over_budget"] += 1
+            return False
+        self.credits -= 1
+        return True
+
+    async def race(
+        self,
+        math_call: Callable[[], Awaitable[tuple[str, float]]],
+        llm_call: Callable[[], Awaitable[str]],
+    ) -> tuple[str, str, float | None]:
+        """
+        Run both calls and return ("math" or "llm", answer, math confidence)
+        for the first confident answer, cancelling the LLM call if it lost.
+        The confidence is None for LLM answers.
+        """
+        self.stats["speculations"] += 1
+        started = time.perf_counter()
+        math_task = asyncio.ensure_future(math_call())
+        llm_task = asyncio.ensure_future(llm_call())
+        math_answer = None
+        try:
+            pending = {math_task, llm_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                if math_task in done and math_task.exception() is None:
+                    math_answer, confidence = math_task.result()
+                    if confidence >= self.min_confidence:
+                        if not llm_task.done():
+                            self.stats["llm_cancelled"] += 1
+                            self.stats["llm_seconds_wasted"] += time.perf_counter() - started
+                        self.stats["math_wins"] += 1
+                        return "math", math_answer, confidence
+
+                if llm_task in done and llm_task.exception() is None:
+                    self.stats["math_calls_wasted"] += 1
+                    self.stats["llm_wins"] += 1
+                    return "llm", llm_task.result(), None
+
+            # Neither call produced a confident answer
+            if math_answer is not None:
+                self.stats["math_fallbacks"] += 1
+                return "math", math_answer, confidence
+            # Both failed: surface the LLM's error like the non-speculative path would
+            return "llm", llm_task.result(), None
+        finally:
+            if not llm_task.done():
+                llm_task.cancel()
+            if not math_task.done():
+                self.stats["math_abandoned"] += 1
+                math_task.add_done_callback(functools.partial(self._record_abandoned_math, time.perf_counter()))
+
+    def _record_abandoned_math(self, abandoned_at: float, math_task: asyncio.Future):
+        self.stats["math_abandoned_seconds"] += time.perf_counter() - abandoned_at
+        if not math_task.cancelled():
+            # Nobody awaits the task any more, so retrieve its error here
+            math_task.exception()
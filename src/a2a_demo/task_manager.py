@@ -23,22 +23,66 @@ from google_a2a.common.types import(
 
 import asyncio
 
+from a2a_demo.admission import (
+    AdmissionController,
+    ServerOverloadedError,
+    admission_controlled,
+    current_route,
+    current_work,
+)
 from a2a_demo.agent import create_ollama_agent, run_ollama
+from a2a_demo.batching import JSONRPCBatcher
+from a2a_demo.math_task_manager import (
+    CONFIDENCE_EXACT,
+    CONFIDENCE_GUESS,
+    CONFIDENCE_KEY,
+    CONFIDENCE_NONE,
+    WORD_OPERATORS,
+)
+from a2a_demo.speculation import SpeculativeRouter
+from a2a_demo.tracing import TRACEPARENT, current_traceparent, traced
+from a2a_demo.transport import MultiplexedTransport, TransportUnavailable
 
 logger = logging.getLogger(__name__)
 
+# Patterns of text that is unmistakably math
+MATH_EXPRESSION_PATTERNS = [
+    r'\d+\s*[\+\-\*\/\^\%]\s*\d+',  # Basic arithmetic operations
+    r'(sqrt|sin|cos|tan|log|exp)\s*\(',  # Math functions
+]
+# Patterns of wording that suggests a math question
+MATH_WORDING_PATTERNS = [
+    r'calculate\s+',  # Words indicating calculation
+    r'compute\s+',
+    r'solve\s+',
+    r'what is\s+\d+',  # "What is" followed by number
+    r'what\'s\s+\d+',
+    r'equals\s+',
+    r'equal to\s+'
+]
+
 class MathAgentClient:
     """Client for communicating with the Math Agent"""
     
-    def __init__(self, math_agent_url=None, max_retries=3, retry_delay=2):
+    def __init__(self, math_agent_url=None, max_retries=3, retry_delay=2, batch_window=0.0, multiplex=False):
         self.math_agent_url = math_agent_url
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.agent_card = None
+        self.batcher = None
+        self.transport = None
+        # Until when the Math Agent asked us to back off after shedding a task
+        self.overloaded_until = 0.0
         
         # Don't try to connect if URL is None
         if self.math_agent_url:
             self._fetch_agent_card_with_retry()
+            # Group concurrent delegations into JSON-RPC batch requests
+            if batch_window > 0:
+                self.batcher = JSONRPCBatcher(f"{self.math_agent_url}/", window=batch_window)
+            # Use the multiplexed transport if the Math Agent's card offers one we support
+            if multiplex and self.agent_card is not None:
+                self.transport = MultiplexedTransport.from_agent_card(self.agent_card)
     
     def _fetch_agent_card_with_retry(self):
         """Fetch the Math Agent's card with retry logic"""
@@ -79,20 +123,31 @@ class MathAgentClient:
         """
         Solve a math problem using either the Math Agent or local solver.
         """
+        return self.solve_math_problem_with_confidence(math_text)[0]
+    
+    @traced("math_client.solve_math_problem")
+    def solve_math_problem_with_confidence(self, math_text):
+        """
+        Solve a math problem like solve_math_problem, also returning how much
+        the math engine trusts its answer (one of the CONFIDENCE_* values).
+        """
         # Try to delegate to Math Agent first, fall back to local solver if needed
-        if self.is_available():
+        if self.is_available() and time.monotonic() < self.overloaded_until:
+            logger.debug("Math Agent asked to back off, solving locally")
+        elif self.is_available():
             try:
-                result = self._try_math_agent(math_text)
+                result, confidence = self._try_math_agent(math_text)
                 if "Error" not in result and "failed" not in result:
-                    return result
+                    return result, confidence
             except Exception as e:
                 logger.warning(f"Math Agent error: {e}, falling back to local solver")
         
         # Fall back to local solver
         return self._solve_locally(math_text)
     
+    @traced("math_client.try_math_agent")
     def _try_math_agent(self, math_text):
-        """Try to delegate to Math Agent"""
+        """Try to delegate to Math Agent, returning its answer and confidence"""
         task_id = str(uuid.uuid4())
         
         try:
@@ -106,32 +161,63 @@ class MathAgentClient:
                     "message": {
                         "role": "user",
                         "parts": [{"text": math_text}]
-                    }
+                    },
+                    # Trace context travels in the payload too, for non-HTTP transports
+                    "metadata": {TRACEPARENT: current_traceparent()}
                 }
             }
             
-            response = requests.post(
-                f"{self.math_agent_url}/tasks/send",
-                json=payload,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
+            result = self._send_request(payload)
+            
+            # The Math Agent shed the task: honour its retryAfter before delegating again
+            error = result.get("error") or {}
+            if error.get("code") == ServerOverloadedError().code:
+                data = error.get("data") or {}
+                retry_after = float(data.get("retryAfter") or self.retry_delay)
+                self.overloaded_until = time.monotonic() + retry_after
+                logger.warning(f"Math Agent is overloaded ({data.get('reason')}), not delegating for {retry_after}s")
+                return f"Error: Math Agent is overloaded, retry after {retry_after}s", CONFIDENCE_NONE
             
             # Extract response text from result
             if "result" in result and "status" in result["result"] and "message" in result["result"]["status"]:
+                # Math Agents that don't report confidence are trusted no more than a guess
+                confidence = (result["result"].get("metadata") or {}).get(CONFIDENCE_KEY, CONFIDENCE_GUESS)
                 message = result["result"]["status"]["message"]
                 if "parts" in message:
                     for part in message["parts"]:
                         if "text" in part:
-                            return part["text"]
+                            return part["text"], confidence
             
-            return f"Error: Could not extract result from Math Agent response"
+            return f"Error: Could not extract result from Math Agent response", CONFIDENCE_NONE
         except Exception as e:
-            return f"Error: Math Agent communication failed - {str(e)}"
+            return f"Error: Math Agent communication failed - {str(e)}", CONFIDENCE_NONE
+    
+    def _send_request(self, payload):
+        """Send a JSON-RPC request to the Math Agent over the best available transport"""
+        if self.transport is not None:
+            # Only a request that never left can be sent again: once written, the
+            # Math Agent may be working on it even if the response never arrives
+            try:
+                return self.transport.call(payload, timeout=10)
+            except TransportUnavailable as e:
+                logger.warning(f"Multiplexed transport unavailable, falling back to HTTP: {e}")
+
+        headers = {TRACEPARENT: current_traceparent()}
+        if self.batcher is not None:
+            return self.batcher.call(payload, headers=headers, timeout=10)
+
+        response = requests.post(
+            f"{self.math_agent_url}/",
+            json=payload,
+            headers=headers,
+            timeout=10
+        )
+        response.raise_for_status()
+        return response.json()
     
+    @traced("math_client.solve_locally")
     def _solve_locally(self, math_text):
-        """Solve math problem locally"""
+        """Solve math problem locally, returning the answer and its confidence"""
         try:
             import re
             import math as math_lib
@@ -155,7 +241,7 @@ class MathAgentClient:
                 elif operator == '/': result = num1 / num2 if num2 != 0 else "Cannot divide by zero"
                 elif operator == '^': result = num1 ** num2
                 
-                return f"(Local calculation) {num1} {operator} {num2} = {result}"
+                return f"(Local calculation) {num1} {operator} {num2} = {result}", CONFIDENCE_EXACT
                 
             elif function_match:
                 func_name = function_match.group(1)
@@ -168,19 +254,19 @@ class MathAgentClient:
                 elif func_name == 'log': result = math_lib.log10(num)
                 elif func_name == 'exp': result = math_lib.exp(num)
                     
-                return f"(Local calculation) {func_name}({num}) = {result}"
+                return f"(Local calculation) {func_name}({num}) = {result}", CONFIDENCE_EXACT
             
             # Extract numbers as a last resort
             numbers = re.findall(r'\d+', math_text)
             if len(numbers) >= 2:
                 num1, num2 = int(numbers[0]), int(numbers[1])
-                return f"(Local calculation) Found numbers {num1} and {num2}. Their sum is {num1 + num2}"
+                return f"(Local calculation) Found numbers {num1} and {num2}. Their sum is {num1 + num2}", CONFIDENCE_GUESS
             
-            return f"I couldn't identify a math problem in your query: '{math_text}'"
+            return f"I couldn't identify a math problem in your query: '{math_text}'", CONFIDENCE_NONE
             
         except Exception as e:
             logger.error(f"Error in local math solver: {e}")
-            return f"Error solving math problem locally: {str(e)}"
+            return f"Error solving math problem locally: {str(e)}", CONFIDENCE_NONE
 
 
 class MyAgentTaskManager(InMemoryTaskManager):
@@ -188,9 +274,15 @@ class MyAgentTaskManager(InMemoryTaskManager):
         self,
         ollama_host: str,
         ollama_model: typing.Union[None, str],
-        math_agent_url: str = None
+        math_agent_url: str = None,
+        admission: typing.Optional[AdmissionController] = None,
+        math_batch_window: float = 0.0,
+        multiplex: bool = False,
+        speculation: typing.Optional[SpeculativeRouter] = None,
     ):
         super().__init__()
+        self.admission = admission
+        self.speculation = speculation
         if ollama_model is not None:
             self.ollama_agent = create_ollama_agent(
                 ollama_base_url=ollama_host,
@@ -200,7 +292,7 @@ class MyAgentTaskManager(InMemoryTaskManager):
             self.ollama_agent = None
         
         # Initialize the Math Agent client
-        self.math_client = MathAgentClient(math_agent_url)
+        self.math_client = MathAgentClient(math_agent_url, batch_window=math_batch_window, multiplex=multiplex)
         
         # Log math delegation status
         if self.math_client.is_available():
@@ -208,28 +300,38 @@ class MyAgentTaskManager(InMemoryTaskManager):
         else:
             logger.warning("Math delegation is disabled")
 
+    @traced("echo.is_math_question")
     def _is_math_question(self, text):
         """Detect if the text contains a math question or expression"""
-        # Patterns to detect math questions
-        patterns = [
-            r'\d+\s*[\+\-\*\/\^\%]\s*\d+',  # Basic arithmetic operations
-            r'(sqrt|sin|cos|tan|log|exp)\s*\(',  # Math functions
-            r'calculate\s+',  # Words indicating calculation
-            r'compute\s+',
-            r'solve\s+',
-            r'what is\s+\d+',  # "What is" followed by number
-            r'what\'s\s+\d+',
-            r'equals\s+',
-            r'equal to\s+'
-        ]
-        
         # Check if any pattern matches
-        for pattern in patterns:
+        for pattern in MATH_EXPRESSION_PATTERNS + MATH_WORDING_PATTERNS:
             if re.search(pattern, text.lower()):
                 return True
         
         return False
 
+    def _math_score(self, text):
+        """
+        Score how clearly the text is a math question: 1.0 for an explicit
+        expression, 0.5 when only its wording suggests math, 0.0 otherwise
+        """
+        lowered = text.lower()
+        if any(re.search(pattern, lowered) for pattern in MATH_EXPRESSION_PATTERNS):
+            return 1.0
+        if any(re.search(pattern, lowered) for pattern in MATH_WORDING_PATTERNS):
+            return 0.5
+        if any(re.search(pattern, lowered) for pattern, _ in WORD_OPERATORS):
+            return 0.5
+        return 0.0
+
+    async def _run_llm(self, prompt):
+        """Ask the LLM, counting the call towards the speculation budget"""
+        if self.speculation is not None:
+            self.speculation.record_llm_call()
+        return await run_ollama(ollama_agent=self.ollama_agent, prompt=prompt)
+
+    @admission_controlled(SendTaskResponse)
+    @traced("echo.on_send_task")
     async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
         """
         This method queries or creates a task for the agent.
@@ -243,31 +345,63 @@ class MyAgentTaskManager(InMemoryTaskManager):
         # Extract the user's message
         received_text = request.params.message.parts[0].text
         
+        math_available = self.math_client.is_available()
+        confidence = None
+        
+        # For prompts that may or may not be math, ask the Math Agent and the LLM at once
+        if (
+            self.speculation is not None
+            and self.ollama_agent is not None
+            and math_available
+            and self.speculation.is_ambiguous(self._math_score(received_text))
+            and self.speculation.try_acquire()
+        ):
+            logger.info(f"Ambiguous question, speculating on Math Agent and LLM: {received_text}")
+            route, answer, confidence = await self.speculation.race(
+                lambda: asyncio.to_thread(self.math_client.solve_math_problem_with_confidence, received_text),
+                lambda: self._run_llm(received_text),
+            )
+            if route == "math":
+                response_text = f"I've delegated your math question to our specialized Math Agent: {answer}"
+            else:
+                response_text = answer
+            route = f"speculative-{route}"
         # Check if it's a math question
-        if self._is_math_question(received_text) and self.math_client.is_available():
+        elif self._is_math_question(received_text) and math_available:
             logger.info(f"Detected math question: {received_text}")
             logger.info("Delegating to Math Agent")
             
-            # Get the answer from the Math Agent
-            math_result = self.math_client.solve_math_problem(received_text)
+            # Get the answer from the Math Agent, off the event loop so other tasks keep running
+            math_result, confidence = await asyncio.to_thread(
+                self.math_client.solve_math_problem_with_confidence, received_text
+            )
             
             # Format the response to acknowledge delegation
             response_text = f"I've delegated your math question to our specialized Math Agent: {math_result}"
+            route = "math"
         else:
             # Not a math question or Math Agent not available, process normally
             response_text = f"on_send_task received: {received_text}"
             if self.ollama_agent is not None:
-                response_text = await run_ollama(ollama_agent=self.ollama_agent, prompt=received_text)
+                response_text = await self._run_llm(received_text)
+            route = "llm"
         
         task = await self._update_task(
             task_id=task_id,
             task_state=TaskState.COMPLETED,
             response_text=response_text,
         )
+        # Record how the answer was produced
+        current_route.set(route)
+        task.metadata = {**(task.metadata or {}), "route": route}
+        if confidence is not None:
+            task.metadata[CONFIDENCE_KEY] = confidence
         
         # Send the response
         return SendTaskResponse(id=request.id, result=task)
     
+    @admission_controlled(SendTaskStreamingResponse)
+    @traced("echo.on_send_task_subscribe")
     async def on_send_task_subscribe(
         self,
         request: SendTaskStreamingRequest
@@ -292,9 +426,10 @@ class MyAgentTaskManager(InMemoryTaskManager):
         if is_new_task and self._is_math_question(received_text) and self.math_client.is_available():
             logger.info(f"Detected math question (streaming): {received_text}")
             logger.info("Delegating to Math Agent")
+            current_route.set("math")
             
-            # Get the answer from the Math Agent
-            math_result = self.math_client.solve_math_problem(received_text)
+            # Get the answer from the Math Agent, off the event loop so other tasks keep running
+            math_result = await asyncio.to_thread(self.math_client.solve_math_problem, received_text)
             
             # Format the response
             response_text = f"I've delegated your math question to our specialized Math Agent: {math_result}"
@@ -343,7 +478,8 @@ class MyAgentTaskManager(InMemoryTaskManager):
             )
         else:
             # Start the asynchronous work for this task
-            asyncio.create_task(self._stream_3_messages(request=request))
+            current_route.set("llm")
+            current_work.set(asyncio.create_task(self._stream_3_messages(request=request)))
         
 
         # Tell the client to expect future streaming responses
@@ -355,6 +491,7 @@ class MyAgentTaskManager(InMemoryTaskManager):
 
 
     
+    @traced("echo.update_task")
     async def _update_task(
         self,
         task_id: str,
@@ -389,7 +526,7 @@ class MyAgentTaskManager(InMemoryTaskManager):
         text_messages = ["one", "two", "three"]
         for text in text_messages:
             if self.ollama_agent is not None:
-                ollama_rsp = await run_ollama(ollama_agent=self.ollama_agent, prompt=f"one: {received_test}")
+                ollama_rsp = await self._run_llm(f"one: {received_test}")
                 message_text = f"{text}: {ollama_rsp}"
             else:
                 message_text = f"{text}: {received_test}"
@@ -0,0 +1,204 @@
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+# Name of the agent handling the current request, set by AgentServer
+current_service = contextvars.ContextVar("current_service", default="a2a-demo")
+
+
+class Span:
+    """One timed stage of a request, identified W3C Trace Context style"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.service = current_service.get()
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "startTime": self.start_time,
+            "durationMs": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class FileSpanExporter:
+    """
+    Appends finished spans to a file, one JSON object per line.
+
+    export() only queues the span; a background thread serializes it and
+    writes to a file kept open for the exporter's lifetime, flushing whenever
+    it has caught up with the queue.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._write_loop, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.put(span)
+
+    def _write_loop(self):
+        while True:
+            span = self._queue.get()
+            while span is not None:
+                try:
+                    self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                except Exception as e:
+                    logger.warning(f"Failed to export span {span.name}: {e}")
+                try:
+                    span = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._file.flush()
+            if span is None:
+                self._file.close()
+                return
+
+    def close(self):
+        """Write out the spans queued so far and close the file"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+_exporter: Optional[FileSpanExporter] = None
+
+
+def configure_tracing(path: Optional[str]):
+    """Export spans to `path`, or stop exporting them if it is None"""
+    global _exporter
+    if _exporter is not None and _exporter.path == path:
+        return
+    previous, _exporter = _exporter, FileSpanExporter(path) if path else None
+    if previous is not None:
+        previous.close()
+    if path:
+        logger.info(f"Writing traces to {path}")
+
+
+@atexit.register
+def _close_exporter():
+    if _exporter is not None:
+        _exporter.close()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple[str, str]]:
+    """Return (trace_id, parent_span_id) from a traceparent value, if valid"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def current_traceparent() -> Optional[str]:
+    """Traceparent value to send along with outgoing calls"""
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def start_span(name: str, traceparent: Optional[str] = None, **attributes):
+    """
+    Time the enclosed block as a span.
+
+    The span is a child of the current span, or of the remote caller's span
+    when `traceparent` is given, or else starts a new trace. When tracing is
+    not configured nothing is recorded and the block gets None.
+    """
+    if _exporter is None:
+        return _NO_SPAN
+    return _span(name, traceparent, attributes)
+
+
+@contextlib.contextmanager
+def _span(name: str, traceparent: Optional[str], attributes: dict):
+    remote = parse_traceparent(traceparent)
+    parent = _current_span.get()
+    if remote is not None:
+        trace_id, parent_id = remote
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+
+    span = Span(name, trace_id, parent_id, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attributes["error"] = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(span)
+
+
+def traced(name: str):
+    """Decorate a function or coroutine function so each call is recorded as a span"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    return await func(*args, **kwargs)
+                with start_span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,166 @@
+import concurrent.futures
+import importlib.util
+import json
+import logging
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    from websockets.sync.client import connect as websocket_connect
+except ImportError:
+    websocket_connect = None
+
+logger = logging.getLogger(__name__)
+
+# WebSocket subprotocols for JSON-RPC over one multiplexed connection, most compact first.
+# Each message is one JSON-RPC request or response; responses are matched to requests by id.
+SUBPROTOCOL_MSGPACK = "a2a.jsonrpc.msgpack"
+SUBPROTOCOL_JSON = "a2a.jsonrpc.json"
+
+WEBSOCKET_PATH = "/ws"
+TRANSPORT_WEBSOCKET = "websocket"
+
+
+class TransportError(Exception):
+    """Raised when a call could not be completed over the multiplexed transport"""
+
+
+class TransportUnavailable(TransportError):
+    """Raised when a request was never written, so it is safe to send it another way"""
+
+
+def supported_subprotocols() -> list[str]:
+    """Subprotocols this process can encode, in order of preference"""
+    if msgpack is not None:
+        return [SUBPROTOCOL_MSGPACK, SUBPROTOCOL_JSON]
+    return [SUBPROTOCOL_JSON]
+
+
+def can_serve_websockets() -> bool:
+    """Whether uvicorn has a WebSocket implementation available to serve with"""
+    return any(importlib.util.find_spec(name) is not None for name in ("websockets", "wsproto"))
+
+
+def encode(subprotocol: str, message) -> bytes | str:
+    if subprotocol == SUBPROTOCOL_MSGPACK:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"))
+
+
+def decode(subprotocol: str, data: bytes | str):
+    if subprotocol == SUBPROTOCOL_MSGPACK:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+class MultiplexedTransport:
+    """
+    Sends JSON-RPC calls to an agent over one long-lived WebSocket connection.
+
+    Any number of threads may call concurrently; every request is written to
+    the shared connection and a reader thread hands each response back to the
+    caller waiting on its JSON-RPC id. The connection is opened on first use
+    and reopened after a failure, no sooner than `retry_interval` seconds.
+    """
+
+    def __init__(self, url: str, subprotocols: list[str], retry_interval: float = 5.0):
+        self.url = url
+        self.subprotocols = subprotocols
+        self.retry_interval = retry_interval
+        self.subprotocol = None
+        self._connection = None
+        self._pending: dict = {}
+        self._lock = threading.Lock()
+        self._failed_at = None
+
+    @classmethod
+    def from_agent_card(cls, agent_card: dict):
+        """Build a transport from an agent card's `transports`, if both sides support one"""
+        if websocket_connect is None:
+            logger.info("websockets is not installed, using JSON-RPC over HTTP")
+            return None
+        for transport in agent_card.get("transports", []):
+            if transport.get("type") != TRANSPORT_WEBSOCKET:
+                continue
+            subprotocols = [p for p in supported_subprotocols() if p in transport.get("subprotocols", [])]
+            if subprotocols:
+                return cls(transport["url"], subprotocols)
+        return None
+
+    def call(self, payload: dict, timeout: float = 10) -> dict:
+        """
+        Send one JSON-RPC request and wait for its response.
+
+        Raises TransportUnavailable if the request could not be sent, and
+        TransportError if it was sent but no response came back.
+        """
+        future = concurrent.futures.Future()
+        with self._lock:
+            connection = self._connect()
+            self._pending[payload["id"]] = future
+            try:
+                connection.send(encode(self.subprotocol, payload))
+            except Exception as e:
+                del self._pending[payload["id"]]
+                self._disconnect(connection, e)
+                raise TransportUnavailable(f"Failed to send over {self.url}: {e}") from e
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            with self._lock:
+                self._pending.pop(payload["id"], None)
+            raise TransportError(f"Timed out waiting for response over {self.url}")
+
+    def _connect(self):
+        """Return the open connection, opening it if needed. Called with the lock held."""
+        if self._connection is not None:
+            return self._connection
+        if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval:
+            raise TransportUnavailable(f"{self.url} failed recently, not retrying yet")
+        try:
+            connection = websocket_connect(self.url, subprotocols=self.subprotocols, open_timeout=5)
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            raise TransportUnavailable(f"Failed to connect to {self.url}: {e}") from e
+
+        self.subprotocol = connection.subprotocol
+        self._connection = connection
+        self._failed_at = None
+        logger.info(f"Connected to {self.url} using {self.subprotocol}")
+        threading.Thread(target=self._read_loop, args=(connection,), name="multiplexed-reader", daemon=True).start()
+        return connection
+
+    def _disconnect(self, connection, error: Exception):
+        """Drop a broken connection and fail every call waiting on it. Called with the lock held."""
+        if self._connection is not connection:
+            return
+        self._connection = None
+        self._failed_at = time.monotonic()
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(TransportError(f"Connection to {self.url} lost: {error}"))
+        connection.close()
+
+    def _read_loop(self, connection):
+        try:
+            for data in connection:
+                response = decode(self.subprotocol, data)
+                with self._lock:
+                    future = self._pending.pop(response.get("id"), None)
+                if future is not None:
+                    future.set_result(response)
+            error = ConnectionError("connection closed")
+        except Exception as e:
+            error = e
+        with self._lock:
+            self._disconnect(connection, error)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._disconnect(self._connection, ConnectionError("transport closed"))
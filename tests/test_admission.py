@@ -0,0 +1,139 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from a2a_demo import admission as admission_module
+from a2a_demo.admission import AdmissionController, AdmissionRejected, AIMDLimit, admission_controlled, current_work
+
+
+def _controller(**kwargs) -> AdmissionController:
+    options = {"max_concurrency": 1, "queue_timeout": 1.0, "client_rate": 0, "adaptive": False}
+    return AdmissionController(**{**options, **kwargs})
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    async def scenario():
+        admission = _controller()
+        admitted_at = await admission.acquire("a")
+        first = asyncio.create_task(admission.acquire("b"))
+        second = asyncio.create_task(admission.acquire("c"))
+        await asyncio.sleep(0)
+
+        # The slot goes to the first waiter, which is cancelled before it gets to run
+        admission.release(admitted_at)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        await asyncio.wait_for(second, timeout=1)
+        assert admission.inflight == 1
+        assert not admission._waiters
+
+    asyncio.run(scenario())
+
+
+def test_waiter_that_times_out_leaves_the_queue():
+    async def scenario():
+        admission = _controller(queue_timeout=0.05)
+        admitted_at = await admission.acquire("a")
+        with pytest.raises(AdmissionRejected, match="timed out"):
+            await admission.acquire("b")
+        assert not admission._waiters
+
+        admission.release(admitted_at)
+        assert admission.inflight == 0
+        await asyncio.wait_for(admission.acquire("c"), timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_request_rejected_when_expected_wait_exceeds_deadline():
+    async def scenario():
+        admission = _controller(queue_timeout=0.1)
+        # One request that took a second sets the expected wait for a queued one
+        admission.release(await admission.acquire("a") - 1.0)
+        await admission.acquire("a")
+
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejected, match="queue is full") as rejected:
+            await admission.acquire("b")
+        assert time.monotonic() - started < 0.05
+        assert rejected.value.retry_after >= 0.9
+
+    asyncio.run(scenario())
+
+
+def test_idle_client_buckets_are_evicted_once_refilled():
+    async def scenario():
+        admission = _controller(max_concurrency=4, client_rate=1.0, client_burst=1.0)
+        admission.release(await admission.acquire("a"))
+        with pytest.raises(AdmissionRejected, match="rate limit"):
+            await admission.acquire("a")
+        assert "a" in admission._buckets
+
+        admission._evict_idle_buckets(time.monotonic() + 1.5)
+        assert "a" not in admission._buckets
+
+    asyncio.run(scenario())
+
+
+def test_stream_slot_released_when_its_work_ends_even_if_never_read():
+    class Response:
+        def __init__(self, id, error=None):
+            self.id = id
+            self.error = error
+
+    class Request:
+        id = "1"
+
+    class TaskManager:
+        admission = _controller()
+
+        @admission_controlled(Response)
+        async def on_send_task_subscribe(self, request):
+            async def work():
+                raise RuntimeError("LLM failed")
+
+            current_work.set(asyncio.create_task(work()))
+
+            async def events():
+                yield "never read"
+            return events()
+
+    async def scenario():
+        task_manager = TaskManager()
+        await task_manager.on_send_task_subscribe(Request())
+        assert task_manager.admission.inflight == 1
+        await asyncio.sleep(0.01)
+        assert task_manager.admission.inflight == 0
+
+    asyncio.run(scenario())
+
+
+def _feed(limit: AIMDLimit, latencies, clock: list):
+    for latency in latencies:
+        clock[0] += latency / limit.limit
+        limit.on_sample(latency, inflight=limit.limit)
+
+
+def test_latency_variance_is_not_taken_for_congestion(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(admission_module.time, "monotonic", lambda: clock[0])
+    rng = random.Random(1)
+    limit = AIMDLimit(initial_limit=8, max_limit=32)
+
+    _feed(limit, (rng.uniform(0.5, 4.0) for _ in range(5000)), clock)
+    assert limit.limit == 32
+
+
+def test_route_wide_slowdown_shrinks_the_limit(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(admission_module.time, "monotonic", lambda: clock[0])
+    limit = AIMDLimit(initial_limit=32, max_limit=32)
+
+    _feed(limit, [1.0] * 200, clock)
+    assert limit.limit == 32
+    _feed(limit, [3.0] * 20, clock)
+    assert limit.limit < 32
@@ -0,0 +1,90 @@
+import concurrent.futures
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+from a2a_demo.batching import JSONRPCBatcher
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Answers JSON-RPC requests and batches, batch responses in reverse order"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        requests = body if isinstance(body, list) else [body]
+        self.server.received.extend(request["id"] for request in requests)
+        self.server.batches.append(len(requests))
+        for request in requests:
+            gate = self.server.gates.get(request["id"])
+            if gate is not None:
+                gate.wait(5)
+
+        responses = [{"jsonrpc": "2.0", "id": request["id"], "result": request["params"]} for request in requests]
+        data = json.dumps(responses[::-1] if isinstance(body, list) else responses[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.received = []
+    server.batches = []
+    server.gates = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    for gate in server.gates.values():
+        gate.set()
+    server.shutdown()
+
+
+def _wait_until_received(server, request_id: str):
+    while request_id not in server.received:
+        time.sleep(0.005)
+
+
+def _payload(request_id: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tasks/get", "params": {"id": request_id}}
+
+
+def test_batch_responses_are_matched_by_id(server):
+    server.gates["first"] = threading.Event()
+    batcher = JSONRPCBatcher(f"http://127.0.0.1:{server.server_port}/", window=0.2, max_inflight=2)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        # The first call goes out on its own and holds its batch in flight, so the
+        # next ones share a batch, which the server answers in reverse order
+        first = pool.submit(batcher.call, _payload("first"))
+        _wait_until_received(server, "first")
+        calls = {request_id: pool.submit(batcher.call, _payload(request_id)) for request_id in ("a", "b", "c")}
+        for request_id, call in calls.items():
+            assert call.result(timeout=5)["result"] == {"id": request_id}
+        server.gates["first"].set()
+        assert first.result(timeout=5)["id"] == "first"
+    assert server.batches == [1, 3]
+
+
+def test_timed_out_call_is_never_sent(server):
+    server.gates["busy"] = threading.Event()
+    batcher = JSONRPCBatcher(f"http://127.0.0.1:{server.server_port}/", max_inflight=1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        busy = pool.submit(batcher.call, _payload("busy"))
+        _wait_until_received(server, "busy")
+
+        # The only batch slot is taken, so this call waits and gives up
+        with pytest.raises(concurrent.futures.TimeoutError):
+            batcher.call(_payload("late"), timeout=0.1)
+        assert not batcher._pending
+
+        server.gates["busy"].set()
+        busy.result(timeout=5)
+        assert batcher.call(_payload("next"), timeout=5)["id"] == "next"
+    assert "late" not in server.received
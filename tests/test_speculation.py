@@ -0,0 +1,73 @@
+import asyncio
+
+from a2a_demo.speculation import SpeculativeRouter
+
+
+def test_speculation_stays_within_share_of_llm_calls():
+    router = SpeculativeRouter(max_share=0.2, burst=5)
+    speculations = llm_calls = 0
+
+    # Only ambiguous prompts: each one either speculates or goes to the LLM alone,
+    # and both make one LLM call
+    for _ in range(1000):
+        if router.try_acquire():
+            speculations += 1
+        router.record_llm_call()
+        llm_calls += 1
+
+    assert speculations <= router.burst + router.max_share * llm_calls
+    assert router.stats["over_budget"] == llm_calls - speculations
+
+
+def test_refused_speculations_earn_no_credit():
+    router = SpeculativeRouter(max_share=0.5, burst=1)
+    assert router.try_acquire()
+    assert not any(router.try_acquire() for _ in range(10))
+
+
+def test_race_returns_confidence_of_math_answer_and_cancels_llm():
+    router = SpeculativeRouter()
+    llm_cancelled = asyncio.Event()
+
+    async def math_call():
+        return "4", 1.0
+
+    async def llm_call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            llm_cancelled.set()
+            raise
+
+    async def race():
+        result = await router.race(math_call, llm_call)
+        await asyncio.wait_for(llm_cancelled.wait(), timeout=1)
+        return result
+
+    assert asyncio.run(race()) == ("math", "4", 1.0)
+
+
+def test_race_leaves_running_math_call_to_finish_when_llm_wins():
+    router = SpeculativeRouter()
+    math_release = asyncio.Event()
+    math_finished = asyncio.Event()
+
+    async def math_call():
+        await math_release.wait()
+        math_finished.set()
+        return "12", 0.2
+
+    async def llm_call():
+        return "7 and 5 make 12"
+
+    async def race():
+        result = await router.race(math_call, llm_call)
+        assert router.stats["math_abandoned"] == 1
+        assert router.stats["math_abandoned_seconds"] == 0
+        math_release.set()
+        await asyncio.wait_for(math_finished.wait(), timeout=1)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(race()) == ("llm", "7 and 5 make 12", None)
+    assert router.stats["math_abandoned_seconds"] > 0
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+pytest.importorskip("websockets")
+from websockets.sync.server import serve
+
+from a2a_demo.transport import SUBPROTOCOL_JSON, MultiplexedTransport, TransportError, TransportUnavailable
+
+
+@pytest.fixture
+def server():
+    """WebSocket server that reads requests without answering, and drops the connection on request"""
+    received = threading.Event()
+    drop = threading.Event()
+
+    def handler(connection):
+        connection.recv()
+        received.set()
+        drop.wait(5)
+
+    server = serve(handler, "127.0.0.1", 0, subprotocols=[SUBPROTOCOL_JSON])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.received = received
+    server.drop = drop
+    yield server
+    drop.set()
+    server.shutdown()
+
+
+def _transport(server) -> MultiplexedTransport:
+    port = server.socket.getsockname()[1]
+    return MultiplexedTransport(f"ws://127.0.0.1:{port}/ws", [SUBPROTOCOL_JSON])
+
+
+def _payload(request_id: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tasks/get", "params": {"id": request_id}}
+
+
+def test_pending_calls_fail_when_the_connection_drops(server):
+    transport = _transport(server)
+    failure = []
+
+    def call():
+        try:
+            transport.call(_payload("1"), timeout=5)
+        except TransportError as e:
+            failure.append(e)
+
+    caller = threading.Thread(target=call)
+    caller.start()
+    assert server.received.wait(5)
+    server.drop.set()
+    caller.join(5)
+
+    # The request was written, so it must not be retried another way
+    assert len(failure) == 1 and not isinstance(failure[0], TransportUnavailable)
+    assert not transport._pending
+
+
+def test_timeout_after_sending_is_not_reported_as_unavailable(server):
+    transport = _transport(server)
+    with pytest.raises(TransportError) as failure:
+        transport.call(_payload("1"), timeout=0.1)
+    assert not isinstance(failure.value, TransportUnavailable)
+    assert not transport._pending
+    transport.close()
+
+
+def test_connect_failure_is_reported_as_unavailable():
+    transport = MultiplexedTransport("ws://127.0.0.1:1/ws", [SUBPROTOCOL_JSON])
+    with pytest.raises(TransportUnavailable):
+        transport.call(_payload("1"), timeout=1)